@@ -1,9 +1,41 @@
 from dataclasses import dataclass
 from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from scraper_module import ScrapedContent
-from llm_module import LLMModule
+from llm_module import LLMModule, get_shared_llm
+import json
 import re
 
+# Precompiled patterns for contact information (compiled once at import
+# instead of re-compiling/cache-looking-up on every page)
+_EMAIL_RE = re.compile(r'\b[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}\b')
+_PHONE_RE = re.compile(r'(?:\+\d{1,3}[-. ]?)?(?:\(\d{3}\)[-. ]?|\b\d{3}[-. ]?)\d{3}[-. ]?\d{4}\b')
+_SOCIAL_RE = re.compile(r'(?:https?://)?(?:www\.)?(?:facebook|twitter|linkedin|instagram)\.com/[\w\.-]+')
+# Bound how much page text is embedded in prompts and scanned for contact
+# info - a 100KB page would otherwise cost ~25K input tokens per model attempt
+_MAX_CONTENT_CHARS = 6000
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _quick_relevance(text: str, query: str) -> float:
+    """
+    Cheap token-overlap score between page text and the research query,
+    used to skip the LLM for pages that are obviously off-topic
+    """
+    query_tokens = set(_WORD_RE.findall(query.lower()))
+    if not query_tokens:
+        return 0.0
+    text_tokens = set(_WORD_RE.findall(text.lower()))
+    return len(query_tokens & text_tokens) / len(query_tokens)
+
+_ADDRESS_RE = re.compile(
+    r'\b\d{1,6}\s+([A-Z][a-zA-Z]+\s+){1,4}'
+    r'(Street|St|Avenue|Ave|Boulevard|Blvd|Road|Rd|Lane|Ln|Drive|Dr|Court|Ct|Way|Parkway|Pkwy)'
+    r'\b[^\n]{0,80}',
+    re.IGNORECASE
+)
+
 @dataclass
 class ContactInfo:
     emails: List[str]
@@ -11,6 +43,11 @@ class ContactInfo:
     social_media: List[str]
     addresses: List[str]
 
+# Shared immutable sentinel for the error paths; avoids allocating four
+# fresh lists per failed page. Never mutated - callers that fill in fields
+# construct a new ContactInfo instead.
+_EMPTY_CONTACT = ContactInfo(emails=(), phones=(), social_media=(), addresses=())
+
 @dataclass
 class AnalysisResult:
     url: str
@@ -23,56 +60,101 @@ class AnalysisResult:
     error: Optional[str] = None
 
 class ContentAnalyzer:
+    # Candidate models, raced concurrently; first success wins
+    MODELS = [
+        "gemini-2.0-flash-exp",
+        "cerebras-2.0-flash",
+        "deepseek-chat",
+        "gpt-4-mini"
+    ]
+
     def __init__(self):
-        self.llm = LLMModule()
-        # Regex patterns for contact information
-        self.email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-        self.phone_pattern = r'(?:\+\d{1,3}[-.\s]?)?\(?\d{3}\)?[-.\s]?\d{3}[-.\s]?\d{4}'
-        self.social_media_pattern = r'(?:https?://)?(?:www\.)?(?:facebook|twitter|linkedin|instagram)\.com/[\w\.-]+'
-        
-    def _extract_contact_info(self, text: str) -> ContactInfo:
-        """Extract contact information from text using regex patterns"""
-        emails = list(set(re.findall(self.email_pattern, text)))
-        phones = list(set(re.findall(self.phone_pattern, text)))
-        social_media = list(set(re.findall(self.social_media_pattern, text)))
-        
-        # Use LLM to identify addresses
-        address_prompt = """
-        Extract physical addresses from the following text. Return ONLY the addresses, one per line.
-        If no addresses are found, return 'None found'.
-        
-        TEXT:
-        {text}
+        self.llm = get_shared_llm()
+        self._pool = ThreadPoolExecutor(max_workers=4)
+
+    def _query_models(self, prompt: str) -> str:
         """
-        
-        address_response = self.llm.query(
-            model="gemini-2.0-flash-exp",
-            query=address_prompt.format(text=text[:2000])  # Limit text length for address extraction
-        ).content
-        
-        addresses = [addr.strip() for addr in address_response.split('\n') if addr.strip() and addr.strip().lower() != 'none found']
-        
+        Race the candidate models concurrently and return the first
+        non-error response; raises if every model fails
+        """
+        last_error = None
+        futures = {
+            self._pool.submit(self.llm.query, model, prompt): model
+            for model in self.MODELS
+        }
+        try:
+            for future in as_completed(futures):
+                model = futures[future]
+                try:
+                    response = future.result()
+                    if response.error:
+                        last_error = response.error
+                        print(f"Warning: {model} failed ({response.error})")
+                        continue
+                    return response.content
+                except Exception as e:
+                    last_error = e
+                    print(f"Warning: {model} failed ({str(e)})")
+                    continue
+        finally:
+            for future in futures:
+                future.cancel()
+
+        raise Exception(f"All models failed. Last error: {str(last_error)}")
+
+    def _extract_contact_info(self, text: str, llm_addresses: Optional[List[str]] = None) -> ContactInfo:
+        """
+        Extract contact information from text using regex patterns.
+        Addresses come from the regex gazetteer plus whatever the fused
+        analysis prompt reported (llm_addresses) - no separate LLM call.
+        """
+        # dict.fromkeys dedups in one ordered pass, so capping at 5 keeps the
+        # first occurrences on the page rather than an arbitrary set order
+        emails = list(dict.fromkeys(_EMAIL_RE.findall(text)))[:5]
+        phones = list(dict.fromkeys(_PHONE_RE.findall(text)))[:5]
+        social_media = list(dict.fromkeys(_SOCIAL_RE.findall(text)))[:5]
+
+        regex_addresses = (m.group(0).strip() for m in _ADDRESS_RE.finditer(text))
+        addresses = list(dict.fromkeys([*regex_addresses, *(llm_addresses or [])]))[:5]
+
         return ContactInfo(
-            emails=emails[:5],  # Limit to top 5 of each
-            phones=phones[:5],
-            social_media=social_media[:5],
-            addresses=addresses[:5]
+            emails=emails,
+            phones=phones,
+            social_media=social_media,
+            addresses=addresses
         )
 
     def _parse_analysis(self, analysis: str, scraped_content: ScrapedContent) -> AnalysisResult:
         # Parse LLM response
         try:
-            # Extract sections using regex
-            summary_match = re.search(r'SUMMARY:\s*(.*?)\s*RELEVANCE:', analysis, re.DOTALL)
-            relevance_match = re.search(r'RELEVANCE:\s*(.*?)\s*RELEVANCE EXPLANATION:', analysis, re.DOTALL)
-            explanation_match = re.search(r'RELEVANCE EXPLANATION:\s*(.*?)\s*NEXT ACTIONS:', analysis, re.DOTALL)
-            actions_match = re.search(r'NEXT ACTIONS:\s*(.*?)$', analysis, re.DOTALL)
-
-            summary = summary_match.group(1).strip() if summary_match else ""
-            relevance = relevance_match.group(1).strip() if relevance_match else "not relevant"
-            explanation = explanation_match.group(1).strip() if explanation_match else ""
-            actions_text = actions_match.group(1).strip() if actions_match else ""
-            
+            # The sections are requested in a fixed order, so a single linear
+            # scan with str.index beats four regex passes over the response
+            llm_addresses = []
+            try:
+                i1 = analysis.index('SUMMARY:')
+                i2 = analysis.index('RELEVANCE:', i1 + len('SUMMARY:'))
+                i3 = analysis.index('RELEVANCE EXPLANATION:', i2)
+                i4 = analysis.index('NEXT ACTIONS:', i3)
+
+                summary = analysis[i1 + len('SUMMARY:'):i2].strip()
+                relevance = analysis[i2 + len('RELEVANCE:'):i3].strip()
+                explanation = analysis[i3 + len('RELEVANCE EXPLANATION:'):i4].strip()
+
+                # ADDRESSES is the last section; tolerate models that omit it
+                try:
+                    i5 = analysis.index('ADDRESSES:', i4)
+                    actions_text = analysis[i4 + len('NEXT ACTIONS:'):i5].strip()
+                    llm_addresses = [
+                        line.strip('- ').strip()
+                        for line in analysis[i5 + len('ADDRESSES:'):].split('\n')
+                        if line.strip('- ').strip() and line.strip('- ').strip().lower() != 'none found'
+                    ]
+                except ValueError:
+                    actions_text = analysis[i4 + len('NEXT ACTIONS:'):].strip()
+            except ValueError:
+                # Malformed response - keep the previous fallback defaults
+                summary, relevance, explanation, actions_text = "", "not relevant", "", ""
+
             # Parse actions list
             next_actions = [
                 action.strip('- ').strip()
@@ -80,11 +162,12 @@ class ContentAnalyzer:
                 if action.strip('- ').strip()
             ]
 
-            # Extract contact information
-            contact_info = self._extract_contact_info(scraped_content.text)
+            # Extract contact information from the same bounded prefix the
+            # prompt uses, so regex cost stays O(_MAX_CONTENT_CHARS)
+            contact_info = self._extract_contact_info(scraped_content.text[:_MAX_CONTENT_CHARS], llm_addresses)
 
             return AnalysisResult(
-                url=scraped_content.url if hasattr(scraped_content, 'url') else "",
+                url=scraped_content.url,
                 title=scraped_content.title,
                 summary=summary,
                 relevance_rating=relevance,
@@ -95,40 +178,55 @@ class ContentAnalyzer:
 
         except Exception as e:
             return AnalysisResult(
-                url=scraped_content.url if hasattr(scraped_content, 'url') else "",
+                url=scraped_content.url,
                 title=scraped_content.title,
                 summary="",
                 relevance_rating="not relevant",
                 relevance_explanation="Error analyzing content",
-                contact_info=ContactInfo([], [], [], []),
+                contact_info=_EMPTY_CONTACT,
                 next_actions=[],
                 error=str(e)
             )
 
     def analyze_content(self, scraped_content: ScrapedContent, research_query: str) -> AnalysisResult:
         """
-        Analyze scraped content against a research query
+        Analyze scraped content against a research query.
+        A single LLM call covers summary, relevance, next actions and
+        addresses - no separate address round-trip.
         """
         if scraped_content.error:
             return AnalysisResult(
-                url="",
+                url=scraped_content.url,
                 title="",
                 summary="",
                 relevance_rating="not relevant",
                 relevance_explanation="Error accessing content",
-                contact_info=ContactInfo([], [], [], []),
+                contact_info=_EMPTY_CONTACT,
                 next_actions=[],
                 error=scraped_content.error
             )
 
         try:
+            # Short-circuit pages that share no vocabulary with the query -
+            # no LLM call needed to classify those as not relevant
+            if _quick_relevance(scraped_content.text[:4000], research_query) < 0.02:
+                return AnalysisResult(
+                    url=scraped_content.url,
+                    title=scraped_content.title,
+                    summary="",
+                    relevance_rating="not relevant",
+                    relevance_explanation="Page content shares no terms with the research query",
+                    contact_info=_EMPTY_CONTACT,
+                    next_actions=[]
+                )
+
             # Create analysis prompt
             analysis_prompt = f"""
             RESEARCH QUERY: {research_query}
 
             WEBSITE CONTENT:
             Title: {scraped_content.title}
-            Content: {scraped_content.text}
+            Content: {scraped_content.text[:_MAX_CONTENT_CHARS]}
 
             Analyze this website content in relation to the research query. Provide:
 
@@ -136,6 +234,7 @@ class ContentAnalyzer:
             2. Relevance rating (MUST be exactly one of: Very relevant, relevant, somewhat relevant, not relevant)
             3. Brief explanation of the relevance rating (max 100 words)
             4. List of recommended next actions based on the content and query (max 5 items)
+            5. Any physical addresses found in the content ('None found' if there are none)
 
             Format your response exactly as follows:
             SUMMARY:
@@ -151,48 +250,97 @@ class ContentAnalyzer:
             - [action 1]
             - [action 2]
             etc.
+
+            ADDRESSES:
+            - [address 1]
+            - [address 2]
+            etc.
             """
 
-            # Try models in sequence
-            models = [
-                "gemini-2.0-flash-exp",
-                "cerebras-2.0-flash",
-                "deepseek-chat",
-                "gpt-4-mini"
-            ]
-
-            last_error = None
-            for model in models:
-                try:
-                    print(f"Trying model: {model}")
-                    analysis = self.llm.query(
-                        model=model,
-                        query=analysis_prompt
-                    ).content
-                    
-                    # If we get here, the model worked
-                    return self._parse_analysis(analysis, scraped_content)
-                    
-                except Exception as e:
-                    last_error = e
-                    print(f"Warning: {model} failed ({str(e)}), trying next model")
-                    continue
-            
-            # If we get here, all models failed
-            raise Exception(f"All models failed. Last error: {str(last_error)}")
+            analysis = self._query_models(analysis_prompt)
+            return self._parse_analysis(analysis, scraped_content)
 
         except Exception as e:
             return AnalysisResult(
-                url=scraped_content.url if hasattr(scraped_content, 'url') else "",
+                url=scraped_content.url,
                 title=scraped_content.title,
                 summary="Error analyzing content",
                 relevance_rating="not relevant",
                 relevance_explanation=f"Error: {str(e)}",
-                contact_info=ContactInfo([], [], [], []),
+                contact_info=_EMPTY_CONTACT,
                 next_actions=["Try analysis again", "Check model availability"],
                 error=str(e)
             )
 
+    def analyze_contents(self, contents: List[ScrapedContent], research_query: str) -> List[AnalysisResult]:
+        """
+        Analyze several scraped pages with a single batched LLM call.
+        Documents are marshaled as <doc id="i"> blocks and the model returns
+        a JSON array, so N pages share one round-trip and one prompt prefix.
+        Pages that error out or fail the quick-relevance check never reach
+        the batch; a parse failure falls back to per-page analysis.
+        """
+        results: List[Optional[AnalysisResult]] = [None] * len(contents)
+
+        # Cheap paths (scrape errors, off-topic pages) resolve without the
+        # LLM via the same short-circuits analyze_content applies
+        batch_indices = []
+        for i, scraped_content in enumerate(contents):
+            if scraped_content.error or _quick_relevance(scraped_content.text[:4000], research_query) < 0.02:
+                results[i] = self.analyze_content(scraped_content, research_query)
+            else:
+                batch_indices.append(i)
+
+        if not batch_indices:
+            return results
+
+        documents = "\n".join(
+            f'<doc id="{i}">\nTitle: {contents[i].title}\nContent: {contents[i].text[:_MAX_CONTENT_CHARS]}\n</doc>'
+            for i in batch_indices
+        )
+        batch_prompt = f"""
+        RESEARCH QUERY: {research_query}
+
+        Analyze each document below in relation to the research query.
+        Respond with ONLY a JSON array containing one object per document:
+        {{"id": <doc id>, "summary": "<max 200 words>", "relevance": "<exactly one of: Very relevant, relevant, somewhat relevant, not relevant>", "relevance_explanation": "<max 100 words>", "next_actions": ["<up to 5 actions>"], "addresses": ["<physical addresses found, if any>"]}}
+
+        DOCUMENTS:
+        {documents}
+        """
+
+        try:
+            analysis = self._query_models(batch_prompt)
+            # Tolerate code fences or prose around the array
+            payload = analysis[analysis.index('['):analysis.rindex(']') + 1]
+            items = {int(item['id']): item for item in json.loads(payload) if 'id' in item}
+        except Exception as e:
+            print(f"Warning: batched analysis failed ({str(e)}), analyzing pages individually")
+            items = {}
+
+        for i in batch_indices:
+            item = items.get(i)
+            if item is None:
+                # Missing from the batch response - analyze individually
+                results[i] = self.analyze_content(contents[i], research_query)
+                continue
+
+            contact_info = self._extract_contact_info(
+                contents[i].text[:_MAX_CONTENT_CHARS],
+                [str(a) for a in item.get('addresses') or []]
+            )
+            results[i] = AnalysisResult(
+                url=contents[i].url,
+                title=contents[i].title,
+                summary=str(item.get('summary', '')),
+                relevance_rating=str(item.get('relevance', 'not relevant')),
+                relevance_explanation=str(item.get('relevance_explanation', '')),
+                contact_info=contact_info,
+                next_actions=[str(a) for a in item.get('next_actions') or []][:5]
+            )
+
+        return results
+
 
 # Example usage
 if __name__ == "__main__":
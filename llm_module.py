@@ -1,31 +1,88 @@
+import hashlib
+import logging
 import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Dict
 from dotenv import load_dotenv
 import google.generativeai as genai
 import openai
 import requests
+from requests.adapters import HTTPAdapter, Retry
 from dataclasses import dataclass
 
 # Load environment variables
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 @dataclass
 class LLMResponse:
     content: str
     model: str
     provider: str
     error: Optional[str] = None
+    status: Optional[int] = None  # HTTP status of a failed call, when known
 
 class LLMModule:
-    def __init__(self):
+    # Maximum number of responses kept in the in-memory cache
+    CACHE_MAXSIZE = 2048
+
+    # How many preferred models query_with_fallback races in parallel;
+    # shared pool so losing calls finish in the background instead of
+    # blocking the winner
+    RACE_WIDTH = 3
+    _race_pool = ThreadPoolExecutor(max_workers=8)
+
+    def __init__(self, cache_path: Optional[str] = None):
+        # In-memory LRU cache of successful responses keyed by (model, prompt
+        # hash). Guarded by a lock: queries come in from several thread pools
+        # (model races, chunked ranking) and an unguarded move_to_end can
+        # race an eviction
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        # Optional on-disk cache so identical prompts survive process restarts
+        # (repeat research runs skip the remote call entirely). Configured via
+        # the cache_path argument or the LLM_CACHE_PATH environment variable.
+        self._disk_cache = None
+        self._disk_lock = threading.Lock()
+        cache_path = cache_path or os.getenv('LLM_CACHE_PATH')
+        if cache_path:
+            self._disk_cache = sqlite3.connect(cache_path, check_same_thread=False)
+            self._disk_cache.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache ("
+                "key TEXT PRIMARY KEY, content TEXT, model TEXT, provider TEXT)"
+            )
+            self._disk_cache.commit()
+
+        # Pooled HTTP session so repeated provider calls reuse keep-alive
+        # connections instead of paying a TCP+TLS handshake every time
+        self._http = requests.Session()
+        self._http.mount('https://', HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=16,
+            max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 502, 503])
+        ))
+
+        # Fallback bookkeeping: the model that last succeeded is tried
+        # first on the next call, and models that came back with a
+        # non-retryable 4xx (bad key, unknown model) are skipped entirely
+        self._last_good_model: Optional[str] = None
+        self._dead_models: set = set()
+
         # Initialize API keys
         self.cerebras_api_key = os.getenv('CEREBRAS_API_KEY')
         self.gemini_api_key = os.getenv('GEMINI_API_KEY')
         self.deepseek_api_key = os.getenv('DEEPSEEK_API_KEY')
         self.openai_api_key = os.getenv('OPENAI_API_KEY')
 
-        # Initialize Gemini
+        # Initialize Gemini; model instances are built lazily and cached
+        # because construction re-parses config on every call otherwise
         genai.configure(api_key=self.gemini_api_key)
+        self._gemini_models: Dict[str, genai.GenerativeModel] = {}
         
         # Initialize OpenAI
         openai.api_key = self.openai_api_key
@@ -68,7 +125,7 @@ class LLMModule:
         """Call Cerebras API"""
         try:
             config = self.MODEL_CONFIGS[model]
-            response = requests.post(
+            response = self._http.post(
                 config["api_url"],
                 headers=config["headers"],
                 json={
@@ -76,7 +133,8 @@ class LLMModule:
                     "prompt": query,
                     "max_tokens": 1000,
                     "temperature": 0.7
-                }
+                },
+                timeout=(5, 30)
             )
             response.raise_for_status()
             return LLMResponse(
@@ -89,14 +147,19 @@ class LLMModule:
                 content="",
                 model=model,
                 provider="cerebras",
-                error=str(e)
+                error=str(e),
+                status=getattr(getattr(e, 'response', None), 'status_code', None)
             )
 
     def _call_gemini(self, model: str, query: str) -> LLMResponse:
         """Call Gemini API"""
         try:
             config = self.MODEL_CONFIGS[model]
-            gemini_model = genai.GenerativeModel(config["model"])
+            gemini_model = self._gemini_models.get(config["model"])
+            if gemini_model is None:
+                gemini_model = self._gemini_models.setdefault(
+                    config["model"], genai.GenerativeModel(config["model"])
+                )
             response = gemini_model.generate_content(query)
             return LLMResponse(
                 content=response.text,
@@ -108,21 +171,24 @@ class LLMModule:
                 content="",
                 model=model,
                 provider="gemini",
-                error=str(e)
+                error=str(e),
+                # google.api_core exceptions expose their HTTP status as .code
+                status=getattr(e, 'code', None)
             )
 
     def _call_deepseek(self, model: str, query: str) -> LLMResponse:
         """Call Deepseek API"""
         try:
             config = self.MODEL_CONFIGS[model]
-            response = requests.post(
+            response = self._http.post(
                 config["api_url"],
                 headers=config["headers"],
                 json={
                     "model": config["model"],
                     "messages": [{"role": "user", "content": query}],
                     "temperature": 0.7
-                }
+                },
+                timeout=(5, 30)
             )
             response.raise_for_status()
             return LLMResponse(
@@ -135,7 +201,8 @@ class LLMModule:
                 content="",
                 model=model,
                 provider="deepseek",
-                error=str(e)
+                error=str(e),
+                status=getattr(getattr(e, 'response', None), 'status_code', None)
             )
 
     def _call_openai(self, model: str, query: str) -> LLMResponse:
@@ -157,9 +224,38 @@ class LLMModule:
                 content="",
                 model=model,
                 provider="openai",
-                error=str(e)
+                error=str(e),
+                status=getattr(e, 'status_code', None)
             )
 
+    @staticmethod
+    def _prompt_digest(query: str) -> str:
+        """Content-addressed key for a prompt"""
+        return hashlib.blake2b(query.encode('utf-8'), digest_size=16).hexdigest()
+
+    def _cached_response(self, model: str, digest: str) -> Optional[LLMResponse]:
+        """Look up a cached response in memory, then on disk"""
+        cache_key = (model, digest)
+        with self._cache_lock:
+            cached = self._cache.get(cache_key)
+            if cached is not None:
+                self._cache.move_to_end(cache_key)
+                return cached
+
+        if self._disk_cache is not None:
+            with self._disk_lock:
+                row = self._disk_cache.execute(
+                    "SELECT content, provider FROM llm_cache WHERE key = ?",
+                    (f"{model}:{digest}",)
+                ).fetchone()
+            if row is not None:
+                response = LLMResponse(content=row[0], model=model, provider=row[1])
+                with self._cache_lock:
+                    self._cache[cache_key] = response
+                return response
+
+        return None
+
     def query(self, model: str, query: str) -> LLMResponse:
         """
         Query an LLM model with the given text
@@ -178,6 +274,14 @@ class LLMModule:
                 error=f"Unknown model: {model}"
             )
 
+        # Check the cache first - identical (model, prompt) pairs recur when
+        # the same page or prompt prefix is analyzed more than once
+        digest = self._prompt_digest(query)
+        cached = self._cached_response(model, digest)
+        if cached is not None:
+            return cached
+        cache_key = (model, digest)
+
         provider = self.MODEL_CONFIGS[model]["provider"]
         provider_map = {
             "cerebras": self._call_cerebras,
@@ -186,7 +290,105 @@ class LLMModule:
             "openai": self._call_openai
         }
 
-        return provider_map[provider](model, query)
+        response = provider_map[provider](model, query)
+
+        # Only cache successful responses so transient failures can be retried
+        if not response.error:
+            with self._cache_lock:
+                self._cache[cache_key] = response
+                if len(self._cache) > self.CACHE_MAXSIZE:
+                    self._cache.popitem(last=False)
+            if self._disk_cache is not None:
+                with self._disk_lock:
+                    self._disk_cache.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, content, model, provider) VALUES (?, ?, ?, ?)",
+                        (f"{model}:{cache_key[1]}", response.content, model, response.provider)
+                    )
+                    self._disk_cache.commit()
+
+        return response
+
+    def query_with_fallback(self, models: list, query: str) -> LLMResponse:
+        """
+        Query a list of models in order, returning the first success.
+        The model that last succeeded is promoted to the front of later
+        calls, and models that failed with a non-retryable 4xx are skipped,
+        so repeated fallback runs do not re-pay dead round trips. All calls
+        share this module's pooled HTTP session and caches.
+        Args:
+            models: Model names to try, in order of preference
+            query: The text to send
+        Returns:
+            LLMResponse from the first model that succeeds, or the last
+            failure if none do
+        """
+        ordered = models
+        if self._last_good_model in models:
+            ordered = [self._last_good_model] + [m for m in models if m != self._last_good_model]
+
+        candidates = [m for m in ordered if m not in self._dead_models]
+        last_response = None
+
+        # A cached response from any candidate makes the whole fallback
+        # free - rank prompts are deterministic, so repeat research passes
+        # over the same results hit this path
+        digest = self._prompt_digest(query)
+        for model in candidates:
+            cached = self._cached_response(model, digest)
+            if cached is not None:
+                self._last_good_model = model
+                return cached
+
+        # Race the top candidates: the worst case of sequential fallback is
+        # the sum of every timeout, racing makes it the fastest success.
+        # The first clean response wins; losers finish in the background.
+        racers = candidates[:self.RACE_WIDTH] if len(candidates) > 1 else []
+        rest = candidates[len(racers):]
+        if racers:
+            futures = [self._race_pool.submit(self.query, m, query) for m in racers]
+            for future in as_completed(futures):
+                response = future.result()
+                if not response.error:
+                    self._last_good_model = response.model
+                    return response
+                logger.warning(f"{response.model} failed ({response.error}), trying next model")
+                # A bad key or unknown model will not get better on retry
+                if response.status in (400, 401, 403, 404):
+                    self._dead_models.add(response.model)
+                last_response = response
+
+        for model in rest:
+            response = self.query(model, query)
+            if not response.error:
+                self._last_good_model = model
+                return response
+            logger.warning(f"{model} failed ({response.error}), trying next model")
+            if response.status in (400, 401, 403, 404):
+                self._dead_models.add(model)
+            last_response = response
+
+        return last_response or LLMResponse(
+            content="",
+            model=models[0] if models else "",
+            provider="unknown",
+            error="No models available"
+        )
+
+
+# Process-wide shared instance: every ranker/analyzer that uses it reuses
+# one HTTP connection pool, one response cache and one fallback state
+# instead of rebuilding them per component
+_SHARED_LLM: Optional[LLMModule] = None
+_shared_llm_lock = threading.Lock()
+
+def get_shared_llm() -> LLMModule:
+    """Return the shared LLMModule, creating it on first use"""
+    global _SHARED_LLM
+    if _SHARED_LLM is None:
+        with _shared_llm_lock:
+            if _SHARED_LLM is None:
+                _SHARED_LLM = LLMModule()
+    return _SHARED_LLM
 
 
 # Example usage
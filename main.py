@@ -1,7 +1,7 @@
 import logging
 from researcher import Researcher, ResearcherRequest, ResearcherResults
 import sys
-from llm_module import LLMModule
+from llm_module import get_shared_llm
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -20,7 +20,7 @@ def main():
         initial_query = input("Enter your initial research query: ")
         
         # Initialize LLM module
-        llm = LLMModule()
+        llm = get_shared_llm()
         
         # Generate research query suggestions
         prompt = f"""
@@ -97,17 +97,17 @@ def main():
                 for action in analysis.next_actions:
                     print(f"- {action}")
                 
-                if analysis.contact_info.emails or analysis.contact_info.phones or \
-                   analysis.contact_info.social_media or analysis.contact_info.addresses:
+                contact = analysis.contact_info
+                if contact.emails or contact.phones or contact.social_media or contact.addresses:
                     print("\nContact Information:")
-                    if analysis.contact_info.emails:
-                        print("Emails:", ", ".join(analysis.contact_info.emails))
-                    if analysis.contact_info.phones:
-                        print("Phones:", ", ".join(analysis.contact_info.phones))
-                    if analysis.contact_info.social_media:
-                        print("Social Media:", ", ".join(analysis.contact_info.social_media))
-                    if analysis.contact_info.addresses:
-                        print("Addresses:", ", ".join(analysis.contact_info.addresses))
+                    if contact.emails:
+                        print("Emails:", ", ".join(contact.emails))
+                    if contact.phones:
+                        print("Phones:", ", ".join(contact.phones))
+                    if contact.social_media:
+                        print("Social Media:", ", ".join(contact.social_media))
+                    if contact.addresses:
+                        print("Addresses:", ", ".join(contact.addresses))
     
     except Exception as e:
         logger.error(f"Main function failed: {str(e)}", exc_info=True)
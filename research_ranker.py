@@ -1,6 +1,9 @@
 from dataclasses import dataclass, field
+from itertools import chain, islice
 from typing import List, Optional, Set
+from urllib.parse import urlsplit, urlunsplit
 import asyncio
+import hashlib
 from search_module import SearchModule
 from search_ranker import SearchRanker
 import concurrent.futures
@@ -15,6 +18,25 @@ logger = logging.getLogger(__name__)
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
 
+
+def _url_fingerprint(url: str) -> bytes:
+    """
+    Compact 8-byte dedup key for a URL. Normalizes scheme/host case and a
+    trailing slash first so trivial variants of the same page collapse.
+    """
+    try:
+        parts = urlsplit(url)
+        url = urlunsplit((
+            parts.scheme.lower(),
+            parts.netloc.lower(),
+            parts.path.rstrip('/'),
+            parts.query,
+            parts.fragment
+        ))
+    except ValueError:
+        pass
+    return hashlib.blake2b(url.encode('utf-8', 'ignore'), digest_size=8).digest()
+
 @dataclass
 class ResearchRequest:
     """
@@ -24,6 +46,7 @@ class ResearchRequest:
     search_queries: Set[str] = field(default_factory=set)
     max_results: Optional[int] = None
     test_mode: bool = False
+    max_concurrency: int = 4  # Concurrent search requests; keep below provider QPS limits
 
 @dataclass
 class ResearchResults:
@@ -42,15 +65,18 @@ class ResearchRanker:
         self.ranker = SearchRanker()
         
         
-    async def _perform_search(self, query: str, test_mode: bool = False) -> List[dict]:
+    async def _perform_search(self, query: str, sem: asyncio.Semaphore, test_mode: bool = False) -> List[dict]:
         """Perform a single search asynchronously"""
         try:
             logger.info(f"Searching for query: {query}")
-            
+
             # Using 20 as default per-query limit to get max 120 results (6 queries * 20)
-            results = self.searcher.search(query, num_results=20)
-            logger.info(f"Raw search results type: {type(results)}")
-            logger.info(f"Raw search results: {results}")
+            # Run the blocking search in a worker thread so gathered queries
+            # actually overlap instead of serializing on the event loop. The
+            # semaphore bounds fan-out so we do not trip provider rate limits.
+            async with sem:
+                results = await asyncio.to_thread(self.searcher.search, query, 20)
+            logger.debug("Raw search results: %r", results)
             
             if isinstance(results, list):
                 return results
@@ -70,32 +96,36 @@ class ResearchRanker:
             logger.error(f"Search failed for query '{query}': {str(e)}", exc_info=True)
             return []
 
-    async def _gather_search_results(self, search_queries: List[str], test_mode: bool = False) -> List[dict]:
+    async def _gather_search_results(self, search_queries: List[str], test_mode: bool = False, max_concurrency: int = 4) -> List[dict]:
         """Gather results from multiple searches asynchronously"""
-        # Perform searches concurrently
-        tasks = [self._perform_search(query, test_mode) for query in search_queries]
+        # Perform searches concurrently, at most max_concurrency at a time
+        sem = asyncio.Semaphore(max_concurrency)
+        tasks = [self._perform_search(query, sem, test_mode) for query in search_queries]
         results = await asyncio.gather(*tasks)
         
-        # Flatten results and remove duplicates by URL
-        seen_urls = set()
-        unique_results = []
-        
-        for result_list in results:
-            for result in result_list:
-                # Get URL (handle both 'url' and 'link' keys)
-                url = result.get('url', result.get('link', ''))
-                
-                if url and url not in seen_urls:
-                    seen_urls.add(url)
-                    # Ensure result has all required fields
-                    standardized_result = {
-                        'url': url,
-                        'title': result.get('title', ''),
-                        'snippet': result.get('snippet', ''),
-                        'publication_date': result.get('publication_date', result.get('date', ''))
-                    }
-                    unique_results.append(standardized_result)
-        
+        # Flatten results and remove duplicates by URL in a single pass.
+        # setdefault keeps the first occurrence and avoids the separate
+        # membership-check-plus-insert dance per record. Keys are 8-byte
+        # blake2b fingerprints of the normalized URL rather than the raw
+        # string, so the dedup table stays small and hashing cost is flat.
+        seen = {}
+        for result in chain.from_iterable(results):
+            # Get URL (handle both 'url' and 'link' keys)
+            url = result.get('url') or result.get('link') or ''
+            if not url:
+                continue
+            seen.setdefault(_url_fingerprint(url), (
+                url,
+                result.get('title', ''),
+                result.get('snippet', ''),
+                result.get('publication_date', result.get('date', ''))
+            ))
+
+        unique_results = [
+            {'url': url, 'title': title, 'snippet': snippet, 'publication_date': date}
+            for url, title, snippet, date in seen.values()
+        ]
+
         logger.info(f"Found {len(unique_results)} unique results")
         return unique_results
 
@@ -117,15 +147,10 @@ class ResearchRanker:
             search_queries = [request.research_query] + list(request.search_queries)
             logger.info(f"Using queries: {search_queries}")
 
-            # Run async search gathering in a new event loop
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            try:
-                search_results = loop.run_until_complete(
-                    self._gather_search_results(search_queries, request.test_mode)
-                )
-            finally:
-                loop.close()
+            # Run async search gathering
+            search_results = asyncio.run(
+                self._gather_search_results(search_queries, request.test_mode, request.max_concurrency)
+            )
 
             logger.info(f"Total search results gathered: {len(search_results)}")
             if not search_results:
@@ -138,22 +163,21 @@ class ResearchRanker:
             logger.info("Ranking results...")
             ranked_results = self.ranker.rank_results(search_results, request.research_query)
             
-            # Convert ranked results to a flat list, prioritizing by relevance
-            all_results = (
-                ranked_results.very_relevant +
-                ranked_results.relevant +
-                ranked_results.somewhat_relevant +
+            # Chain the category lists lazily, prioritizing by relevance, and
+            # only materialize up to max_results - no O(N) concatenation copy
+            buckets = (
+                ranked_results.very_relevant,
+                ranked_results.relevant,
+                ranked_results.somewhat_relevant,
                 ranked_results.not_relevant
             )
-            
-            # Apply max_results limit if specified
-            if request.max_results is not None:
-                all_results = all_results[:request.max_results]
+            all_results = list(islice(chain(*buckets), request.max_results))
+            total_results = sum(len(bucket) for bucket in buckets)
 
-            logger.info(f"Final results count: {len(all_results)}")
+            logger.info(f"Final results count: {len(all_results)} (of {total_results} ranked)")
             return ResearchResults(
                 ranked_results=all_results,
-                total_results=len(all_results)
+                total_results=total_results
             )
 
         except Exception as e:
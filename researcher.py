@@ -1,12 +1,15 @@
 from dataclasses import dataclass
 from typing import List, Optional, Set
 import logging
+import json
 from research_ranker import ResearchRanker, ResearchRequest, ResearchResults
 from search_ranker import RankedResult, SearchRanker
 from analyzer_module import ContentAnalyzer, AnalysisResult
 from scraper_module import ScraperModule, ScrapedContent
-from llm_module import LLMModule
+from llm_module import LLMModule, get_shared_llm
+import re
 import sys
+from urllib.parse import urlparse, urlunparse
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -16,13 +19,16 @@ logger = logging.getLogger(__name__)
 if sys.stdout.encoding != 'utf-8':
     sys.stdout.reconfigure(encoding='utf-8')
 
-@dataclass
+# Matches quoted search queries in LLM responses
+_QUOTED_RE = re.compile(r'"([^"]*)"')
+
+@dataclass(slots=True)
 class ResearcherRequest:
     """Request for the researcher containing queries"""
     research_query: str  # The main research objective/question
     initial_query: str   # The initial search query from user
 
-@dataclass
+@dataclass(slots=True)
 class ResearcherResults:
     """Results from the researcher containing search results and analysis"""
     search_results: List[RankedResult]  # All search results
@@ -39,11 +45,39 @@ class Researcher:
     3. Analyzing the most relevant results in detail
     """
     def __init__(self):
-        self.llm = LLMModule()
+        self.llm = get_shared_llm()
         self.ranker = SearchRanker()
         self.analyzer = ContentAnalyzer()
         self.scraper = ScraperModule()
 
+    @staticmethod
+    def _normalize_url(url: str) -> str:
+        """
+        Canonicalize a URL for deduplication: lowercase scheme and host,
+        drop the fragment, default the path to '/'.
+        """
+        try:
+            p = urlparse(url)
+            return urlunparse((p.scheme.lower(), p.netloc.lower(), p.path or '/', p.params, p.query, ''))
+        except ValueError:
+            return url
+
+    @staticmethod
+    def _parse_queries(response: str) -> Set[str]:
+        """
+        Parse search queries from an LLM response. Prefers the requested
+        JSON array (no quote-escaping ambiguity, no regex); falls back to
+        extracting quoted strings so a chatty response still yields queries
+        instead of triggering a retry.
+        """
+        try:
+            start = response.index('[')
+            end = response.rindex(']') + 1
+            parsed = json.loads(response[start:end])
+            return {q.strip() for q in parsed if isinstance(q, str) and q.strip()}
+        except (ValueError, json.JSONDecodeError):
+            return set(_QUOTED_RE.findall(response))
+
     def _generate_search_queries(self, research_query: str, initial_query: str) -> Set[str]:
         """
         Generate additional search queries based on the research objective
@@ -51,28 +85,29 @@ class Researcher:
         try:
             logger.info(f"Generating search queries for research: {research_query}")
             
+            # Static instructions first, dynamic fields last: identical
+            # prompt prefixes let the provider reuse its server-side
+            # prefix/KV cache across calls
             prompt = f"""
-            RESEARCH OBJECTIVE: {research_query}
-            INITIAL QUERY: {initial_query}
-
-            Generate 4 additional search queries that would help find information about this research objective.
+            Generate 4 additional search queries that would help find information about the research objective below.
             The queries should:
             1. Cover different aspects or angles of the research objective
             2. Use different phrasings and synonyms
             3. Be specific and targeted
             4. Be in German since this is for Berlin
 
-            Format each query in quotes, one per line.
+            Respond with a JSON array of strings, e.g. ["query one", "query two"].
+
+            RESEARCH OBJECTIVE: {research_query}
+            INITIAL QUERY: {initial_query}
             """
-            
+
             response = self.llm.query(
                 "gemini-2.0-flash-exp",
                 prompt
             ).content
-            
-            # Extract queries (anything in quotes)
-            import re
-            queries = set(re.findall(r'"([^"]*)"', response))
+
+            queries = self._parse_queries(response)
             queries.add(initial_query)  # Add the initial query
             
             logger.info(f"Generated queries: {queries}")
@@ -87,12 +122,6 @@ class Researcher:
         Select which URLs to analyze in detail based on their relevance
         """
         try:
-            # Format results for LLM prompt
-            results_text = "\n".join([
-                f"{i+1}. {r.title}\n   URL: {r.url}\n   Snippet: {r.snippet}"
-                for i, r in enumerate(search_results)
-            ])
-            
             # For now, just analyze the top 3 results
             return [r.url for r in search_results[:3]]
             
@@ -140,23 +169,26 @@ class Researcher:
                 all_results,
                 request.research_query
             )
-            
+            # Overlapping search queries often rank the same page more than
+            # once; dedupe on the canonical URL so it is only scraped and
+            # analyzed once (dict keys preserve insertion order)
+            urls_to_analyze = list(dict.fromkeys(
+                self._normalize_url(url) for url in urls_to_analyze
+            ))
+
             # Step 4: Analyze selected URLs
             logger.info(f"Analyzing {len(urls_to_analyze)} URLs")
-            analyzed_results = []
-            for url in urls_to_analyze:
-                try:
-                    scraped_content = self.scraper.scrape(url)
-                    if not scraped_content.error:
-                        # Analyze content
-                        analysis = self.analyzer.analyze_content(
-                            scraped_content,
-                            request.research_query
-                        )
-                        analyzed_results.append(analysis)
-                except Exception as e:
-                    logger.error(f"Error analyzing {url}: {str(e)}", exc_info=True)
-                    continue
+            # Scrape concurrently, then analyze every successful page with a
+            # single batched LLM call instead of one round-trip per URL
+            scraped_contents = [
+                scraped_content
+                for scraped_content in self.scraper.scrape_many(urls_to_analyze)
+                if not scraped_content.error
+            ]
+            analyzed_results = (
+                self.analyzer.analyze_contents(scraped_contents, request.research_query)
+                if scraped_contents else []
+            )
 
             return ResearcherResults(
                 search_results=all_results,
@@ -224,14 +256,14 @@ if __name__ == "__main__":
             for action in analysis.next_actions:
                 print(f"- {action}")
             
-            if analysis.contact_info.emails or analysis.contact_info.phones or \
-               analysis.contact_info.social_media or analysis.contact_info.addresses:
+            contact = analysis.contact_info
+            if contact.emails or contact.phones or contact.social_media or contact.addresses:
                 print("\nContact Information:")
-                if analysis.contact_info.emails:
-                    print("Emails:", ", ".join(analysis.contact_info.emails))
-                if analysis.contact_info.phones:
-                    print("Phones:", ", ".join(analysis.contact_info.phones))
-                if analysis.contact_info.social_media:
-                    print("Social Media:", ", ".join(analysis.contact_info.social_media))
-                if analysis.contact_info.addresses:
-                    print("Addresses:", ", ".join(analysis.contact_info.addresses))
+                if contact.emails:
+                    print("Emails:", ", ".join(contact.emails))
+                if contact.phones:
+                    print("Phones:", ", ".join(contact.phones))
+                if contact.social_media:
+                    print("Social Media:", ", ".join(contact.social_media))
+                if contact.addresses:
+                    print("Addresses:", ", ".join(contact.addresses))
@@ -1,85 +1,201 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter, Retry
+import lxml.html
+from lxml import etree
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import hashlib
+import os
+import pickle
+import threading
+import time
+from urllib.robotparser import RobotFileParser
 from typing import Dict, List, Optional
 from dataclasses import dataclass
 from urllib.parse import urljoin, urlparse
-import re
 
-@dataclass
+@dataclass(slots=True)
 class ScrapedContent:
     text: str
     links: List[Dict[str, str]]  # List of dicts with 'text' and 'url' keys
     title: str
+    url: str = ""  # The URL the content was scraped from
     error: Optional[str] = None
 
 class ScraperModule:
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = None, cache_ttl: float = 3600):
+        # Optional disk cache: repeat research runs skip the fetch+parse
+        # entirely while the entry is fresh, and revalidate cheaply via
+        # ETag/Last-Modified afterwards. Enabled via the cache_dir argument
+        # or the SCRAPER_CACHE_DIR environment variable.
+        self.cache_dir = cache_dir or os.getenv('SCRAPER_CACHE_DIR')
+        self.cache_ttl = cache_ttl
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
-        # Tags to extract text from
-        self.text_tags = ['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'span', 'div']
+        # Persistent session: keep-alive connection reuse skips a TCP+TLS
+        # handshake per URL, and compressed transfers cut HTML bandwidth 3-5x
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=16,
+            pool_maxsize=32,
+            max_retries=Retry(total=2, backoff_factor=0.2)
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({**self.headers, 'Accept-Encoding': 'gzip, deflate, br'})
+        # Tags to extract text from (frozenset: O(1) membership, immutable)
+        self.text_tags = frozenset(['p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'li', 'span', 'div'])
         # Tags to skip
-        self.skip_tags = ['script', 'style', 'noscript', 'header', 'footer', 'nav']
+        self.skip_tags = frozenset(['script', 'style', 'noscript', 'header', 'footer', 'nav'])
         # Maximum words to return
         self.max_words = 10000
+        # Maximum bytes to download per page; max_words never needs more
+        # and a pathological 50 MB page would otherwise be fully buffered
+        self.max_response_bytes = 2_000_000
+        # Per-host politeness: scrape_many can otherwise burst a single
+        # server hard enough to trigger 429s, which serialize everything
+        # through retries. At most 4 in-flight requests per host, plus the
+        # host's robots.txt Crawl-Delay if it declares one.
+        self.max_per_host = 4
+        self._host_lock = threading.Lock()
+        self._host_semaphores: Dict[str, threading.Semaphore] = {}
+        self._robots_cache: Dict[str, Optional[RobotFileParser]] = {}
+        self._last_fetch: Dict[str, float] = {}
 
     def _clean_text(self, text: str) -> str:
         """Clean extracted text by removing extra whitespace and newlines"""
-        # Remove extra whitespace and newlines
-        text = re.sub(r'\s+', ' ', text)
-        # Remove leading/trailing whitespace
-        text = text.strip()
-        return text
-
-    def _is_valid_url(self, url: str) -> bool:
-        """Check if a URL is valid"""
+        # str.split() is a C-level whitespace tokenizer; 2-3x faster than a
+        # \s+ regex for this per-tag hot path
+        return ' '.join(text.split())
+
+    def _cache_path(self, url: str) -> str:
+        digest = hashlib.blake2b(url.encode('utf-8', 'ignore'), digest_size=16).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.pkl")
+
+    def _cache_get(self, url: str) -> Optional[dict]:
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._cache_path(url), 'rb') as f:
+                return pickle.load(f)
+        except Exception:
+            return None
+
+    def _cache_put(self, url: str, entry: dict) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            with open(self._cache_path(url), 'wb') as f:
+                pickle.dump(entry, f)
+        except Exception:
+            pass  # Caching is best-effort; never fail the scrape over it
+
+    def _host_semaphore(self, netloc: str) -> threading.Semaphore:
+        with self._host_lock:
+            return self._host_semaphores.setdefault(
+                netloc, threading.Semaphore(self.max_per_host)
+            )
+
+    def _crawl_delay(self, scheme: str, netloc: str) -> float:
+        """Return the host's robots.txt Crawl-Delay (0 if none or unreadable).
+
+        robots.txt is fetched at most once per host and cached for the
+        lifetime of the module.
+        """
+        with self._host_lock:
+            cached = self._robots_cache.get(netloc, False)
+        if cached is False:
+            # Fetch through the session so the request gets a timeout and
+            # connection reuse; RobotFileParser.read() would block forever
+            # on a blackholing host
+            parser = None
+            try:
+                response = self.session.get(f"{scheme}://{netloc}/robots.txt", timeout=10)
+                if response.ok:
+                    parser = RobotFileParser()
+                    parser.parse(response.text.splitlines())
+            except Exception:
+                pass
+            with self._host_lock:
+                cached = self._robots_cache.setdefault(netloc, parser)
+        if cached is None:
+            return 0.0
+        try:
+            return float(cached.crawl_delay('*') or 0.0)
+        except Exception:
+            return 0.0
+
+    def _throttle(self, scheme: str, netloc: str) -> None:
+        """Sleep if the host's Crawl-Delay says the last fetch was too recent"""
+        delay = self._crawl_delay(scheme, netloc)
+        if delay <= 0:
+            return
+        with self._host_lock:
+            now = time.time()
+            # Reserve the next slot so concurrent threads space themselves out
+            slot = max(now, self._last_fetch.get(netloc, 0.0) + delay)
+            self._last_fetch[netloc] = slot
+        if slot > now:
+            time.sleep(slot - now)
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _is_valid_url(url: str) -> bool:
+        """Check if a URL is valid (cached - link-heavy pages repeat URLs)"""
         try:
             result = urlparse(url)
             return all([result.scheme, result.netloc])
         except:
             return False
 
-    def _extract_text_and_links(self, soup: BeautifulSoup, base_url: str) -> tuple[str, List[Dict[str, str]]]:
+    def _extract_text_and_links(self, root, base_url: str) -> tuple[str, List[Dict[str, str]]]:
         """Extract text and links from the parsed HTML"""
         text_parts = []
         links = []
         word_count = 0
 
-        # First pass: collect all text and links
-        for tag in soup.find_all(True):
-            # Skip unwanted tags and their children
-            if tag.name in self.skip_tags:
-                continue
-
-            # Extract text if it's in our target tags
-            if tag.name in self.text_tags:
-                text = self._clean_text(tag.get_text())
-                if text:
-                    current_words = len(text.split())
-                    if word_count + current_words <= self.max_words:
-                        text_parts.append(text)
-                        word_count += current_words
-                    else:
-                        # Add partial text to reach max_words
-                        words = text.split()
-                        remaining_words = self.max_words - word_count
-                        if remaining_words > 0:
-                            text_parts.append(' '.join(words[:remaining_words]))
-                        break
+        # root.iter with a tag filter walks the tree in C, yielding only the
+        # elements we care about instead of wrapping every node in Python
+        for element in root.iter(*self.text_tags):
+            # Stop walking the tail of large pages once the budget is spent
+            if word_count >= self.max_words:
+                break
+            text = self._clean_text(element.text_content())
+            if text:
+                # Split once; both branches share the word list
+                words = text.split()
+                current_words = len(words)
+                if word_count + current_words <= self.max_words:
+                    text_parts.append(text)
+                    word_count += current_words
+                else:
+                    # Add partial text to reach max_words
+                    remaining_words = self.max_words - word_count
+                    if remaining_words > 0:
+                        text_parts.append(' '.join(words[:remaining_words]))
+                    break
 
-            # Extract links
-            if tag.name == 'a' and len(links) < 100:  # Limit to 100 links
-                href = tag.get('href')
-                if href:
+        for anchor in root.iter('a'):
+            if len(links) >= 100:  # Limit to 100 links
+                break
+            href = anchor.get('href')
+            if href and not href.startswith(('#', 'mailto:', 'javascript:')):
+                # Already-absolute hrefs skip the urljoin parse entirely
+                if href.startswith(('http://', 'https://')):
+                    absolute_url = href
+                else:
                     absolute_url = urljoin(base_url, href)
-                    if self._is_valid_url(absolute_url):
-                        link_text = self._clean_text(tag.get_text())
-                        if link_text:
-                            links.append({
-                                'text': link_text,
-                                'url': absolute_url
-                            })
+                if self._is_valid_url(absolute_url):
+                    link_text = self._clean_text(anchor.text_content())
+                    if link_text:
+                        links.append({
+                            'text': link_text,
+                            'url': absolute_url
+                        })
 
         return ' '.join(text_parts), links
 
@@ -98,34 +214,106 @@ class ScraperModule:
                     text="",
                     links=[],
                     title="",
+                    url=url,
                     error="Invalid URL provided"
                 )
 
-            # Fetch the webpage
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            # Fresh cache entry: skip the network round-trip entirely
+            entry = self._cache_get(url)
+            if entry and time.time() - entry['timestamp'] < self.cache_ttl:
+                return entry['content']
+
+            # Stale entry: ask the server to revalidate instead of re-sending
+            conditional_headers = {}
+            if entry:
+                if entry.get('etag'):
+                    conditional_headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    conditional_headers['If-Modified-Since'] = entry['last_modified']
+
+            # Fetch the webpage, streaming so the download can be capped
+            # instead of buffering arbitrarily large bodies
+            parsed = urlparse(url)
+            with self._host_semaphore(parsed.netloc):
+                self._throttle(parsed.scheme, parsed.netloc)
+                response = self.session.get(url, timeout=10, stream=True, headers=conditional_headers)
+                if response.status_code == 304 and entry:
+                    entry['timestamp'] = time.time()
+                    self._cache_put(url, entry)
+                    return entry['content']
+                response.raise_for_status()
 
-            # Parse HTML
-            soup = BeautifulSoup(response.text, 'lxml')
+                # Skip the parse entirely for PDFs, images and other
+                # binaries that sometimes land in the ranked results
+                ctype = response.headers.get('Content-Type', '').lower()
+                if ctype and 'html' not in ctype and 'xml' not in ctype:
+                    response.close()
+                    return ScrapedContent(
+                        text="",
+                        links=[],
+                        title="",
+                        url=url,
+                        error=f"Unsupported content type: {ctype}"
+                    )
+
+                # A declared oversized body never starts downloading
+                content_length = response.headers.get('Content-Length')
+                if content_length and content_length.isdigit() and int(content_length) > self.max_response_bytes:
+                    response.close()
+                    return ScrapedContent(
+                        text="",
+                        links=[],
+                        title="",
+                        url=url,
+                        error=f"Response too large: {content_length} bytes"
+                    )
+
+                chunks = []
+                total = 0
+                for chunk in response.iter_content(65536):
+                    chunks.append(chunk)
+                    total += len(chunk)
+                    if total >= self.max_response_bytes:
+                        break
+                response.close()
+
+            # Parse HTML directly with lxml - no BeautifulSoup Tag objects.
+            # Feeding bytes lets libxml2 sniff the encoding (headers often
+            # lie; the meta charset is authoritative) without a Python-level
+            # decode pass
+            root = lxml.html.fromstring(b''.join(chunks))
+
+            # Drop scripts/styles/navigation before extraction so their text
+            # never reaches the text walk
+            etree.strip_elements(root, *self.skip_tags, with_tail=False)
 
             # Get title
-            title = soup.title.string if soup.title else ""
-            title = self._clean_text(title)
+            title_element = root.find('.//title')
+            title = self._clean_text(title_element.text_content()) if title_element is not None else ""
 
             # Extract text and links
-            text, links = self._extract_text_and_links(soup, url)
+            text, links = self._extract_text_and_links(root, url)
 
-            return ScrapedContent(
+            content = ScrapedContent(
                 text=text,
                 links=links[:10],  # Return only top 10 links
-                title=title
+                title=title,
+                url=url
             )
+            self._cache_put(url, {
+                'content': content,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'timestamp': time.time()
+            })
+            return content
 
         except requests.RequestException as e:
             return ScrapedContent(
                 text="",
                 links=[],
                 title="",
+                url=url,
                 error=f"Failed to fetch URL: {str(e)}"
             )
         except Exception as e:
@@ -133,9 +321,21 @@ class ScraperModule:
                 text="",
                 links=[],
                 title="",
+                url=url,
                 error=f"Error scraping content: {str(e)}"
             )
 
+    def scrape_many(self, urls: List[str], max_workers: int = 8) -> List[ScrapedContent]:
+        """
+        Scrape several URLs concurrently, overlapping their network latency.
+        Returns one ScrapedContent per URL, in input order; failures are
+        reported through the per-result error field as with scrape().
+        """
+        if not urls:
+            return []
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+            return list(executor.map(self.scrape, urls))
+
 
 # Example usage
 if __name__ == "__main__":
@@ -1,12 +1,44 @@
 from dataclasses import dataclass
 from typing import List, Optional, Dict
-from llm_module import LLMModule
+from llm_module import LLMModule, get_shared_llm
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
 import re
-from operator import attrgetter
+from operator import itemgetter
+from itertools import groupby
+from concurrent.futures import ThreadPoolExecutor
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Matches one "[NUMBER]. RATING: ... EXPLANATION: ..." block in the LLM
+# response; compiled once instead of per rank_results call
+_RESULT_RE = re.compile(r'(\d+)\. RATING: (.*?)\nEXPLANATION: (.*?)(?=\n\d+\.|$)', re.DOTALL)
+
+# Query parameters that vary per click without changing the page
+_TRACKING_PARAMS = frozenset(['fbclid', 'gclid', 'igshid'])
+
+def _canonical_url(url: str) -> str:
+    """Canonicalize a URL for deduplication: lowercase the host, drop the
+    fragment and tracking parameters (utm_*, click ids)."""
+    try:
+        parts = urlsplit(url)
+        query = urlencode([
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.startswith('utm_') and key not in _TRACKING_PARAMS
+        ])
+        return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path, query, ''))
+    except ValueError:
+        return url
+
+# Category order for sorting; unknown ratings rank as not relevant
+_CATEGORY_RANK = {
+    "very relevant": 0,
+    "relevant": 1,
+    "somewhat relevant": 2,
+    "not relevant": 3
+}
+
 @dataclass
 class RankedResult:
     url: str
@@ -26,9 +58,19 @@ class RankingResults:
     error: Optional[str] = None
 
 class SearchRanker:
+    # Results per LLM call: one giant prompt gets slower per-token past a
+    # modest batch size, so larger result sets are split into chunks of
+    # this size and the calls run concurrently
+    BATCH_SIZE = 10
+
+    # Per-result caps in the rating prompt; a rating needs the gist, not
+    # the full text, and bounding these keeps prompt tokens ~flat per chunk
+    MAX_TITLE_CHARS = 200
+    MAX_SNIPPET_CHARS = 300
+
     def __init__(self):
-        self.llm = LLMModule()
-        
+        self.llm = get_shared_llm()
+
     def _calculate_rank_score(self, result: Dict) -> float:
         """
         Calculate a numerical score for ranking within categories.
@@ -51,6 +93,51 @@ class SearchRanker:
             
         return score
 
+    def _build_prompt(self, chunk: List[Dict], query: str) -> str:
+        """Build the rating prompt for one chunk of results (1-based local indices)"""
+        analysis_prompt = f"""
+            RESEARCH QUERY: {query}
+
+            Analyze each search result below and rate its potential relevance for answering the query.
+            Rate each result as exactly one of: Very relevant, relevant, somewhat relevant, not relevant
+            Also provide a brief explanation (max 50 words) for each rating.
+
+            For each result, format your response exactly as:
+            [NUMBER]. RATING: [your rating]
+            EXPLANATION: [your explanation]
+
+            SEARCH RESULTS:
+            """
+
+        for i, result in enumerate(chunk, 1):
+            title = (result.get('title') or 'No title')[:self.MAX_TITLE_CHARS]
+            snippet = (result.get('snippet') or 'No description available')[:self.MAX_SNIPPET_CHARS]
+            analysis_prompt += f"""
+                {i}. TITLE: {title}
+                SNIPPET: {snippet}
+                URL: {result.get('url', 'No URL')}
+                """
+        return analysis_prompt
+
+    # Models to try for ranking, in order of preference
+    MODELS = [
+        "deepseek-reasoner",
+        "gemini-2.0-flash-exp",
+        "cerebras-2.0-flash",
+        "deepseek-chat",
+        "gpt-4-mini"
+    ]
+
+    def _get_analysis(self, analysis_prompt: str):
+        """Run one ranking prompt through the model fallback chain.
+
+        Returns (analysis_text, None) on success or (None, last_error).
+        """
+        response = self.llm.query_with_fallback(self.MODELS, analysis_prompt)
+        if response.error:
+            return None, response.error
+        return response.content, None
+
     def rank_results(self, search_results: List[Dict], query: str) -> RankingResults:
         """
         Rank search results based on their potential relevance to the query
@@ -63,106 +150,141 @@ class SearchRanker:
         try:
             if not search_results:
                 return RankingResults([], [], [], [], "No search results provided")
-            
-            # Prepare prompt for batch analysis
-            analysis_prompt = f"""
-            RESEARCH QUERY: {query}
 
-            Analyze each search result below and rate its potential relevance for answering the query.
-            Rate each result as exactly one of: Very relevant, relevant, somewhat relevant, not relevant
-            Also provide a brief explanation (max 50 words) for each rating.
+            # Tracking-param variants of the same page add prompt tokens
+            # without adding information; keep the first of each canonical URL
+            seen = set()
+            deduped = []
+            for result in search_results:
+                canonical = _canonical_url(result.get('url', ''))
+                if canonical in seen:
+                    continue
+                seen.add(canonical)
+                deduped.append(result)
+            search_results = deduped
 
-            For each result, format your response exactly as:
-            [NUMBER]. RATING: [your rating]
-            EXPLANATION: [your explanation]
+            # One or two results carry no ranking signal worth an LLM round
+            # trip - everything gets analyzed downstream anyway. Return them
+            # score-ordered as plain "relevant"
+            if len(search_results) <= 2:
+                scored = sorted(
+                    ((self._calculate_rank_score(result), result) for result in search_results),
+                    key=itemgetter(0),
+                    reverse=True
+                )
+                return RankingResults(
+                    very_relevant=[],
+                    relevant=[
+                        RankedResult(
+                            url=result.get('url', ''),
+                            title=result.get('title', ''),
+                            snippet=result.get('snippet', ''),
+                            relevance_rating="relevant",
+                            relevance_explanation="",
+                            rank_score=rank_score,
+                            publication_date=result.get('publication_date')
+                        )
+                        for rank_score, result in scored
+                    ],
+                    somewhat_relevant=[],
+                    not_relevant=[]
+                )
 
-            SEARCH RESULTS:
-            """
-            
-            # Add each result to the prompt
-            for i, result in enumerate(search_results, 1):
-                analysis_prompt += f"""
-                {i}. TITLE: {result.get('title', 'No title')}
-                SNIPPET: {result.get('snippet', 'No description available')}
-                URL: {result.get('url', 'No URL')}
-                """
-            
-            # Get LLM analysis
-            models = [
-                "deepseek-reasoner",
-                "gemini-2.0-flash-exp",
-                "cerebras-2.0-flash",
-                "deepseek-chat",
-                "gpt-4-mini"
+            # Partition into bounded chunks; per-call token count stays flat
+            # while the calls for a large result set overlap on the network
+            chunks = [
+                search_results[i:i + self.BATCH_SIZE]
+                for i in range(0, len(search_results), self.BATCH_SIZE)
             ]
+            prompts = [self._build_prompt(chunk, query) for chunk in chunks]
 
-            last_error = None
-            analysis = None
-            
-            for model in models:
-                try:
-                    print(f"Trying model: {model}")
-                    analysis = self.llm.query(
-                        model=model,
-                        query=analysis_prompt
-                    ).content
-                    break  # If we get here, the model worked
-                except Exception as e:
-                    last_error = e
-                    print(f"Warning: {model} failed ({str(e)}), trying next model")
-                    continue
-            
-            if analysis is None:
+            if len(prompts) == 1:
+                analyses = [self._get_analysis(prompts[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=min(4, len(prompts))) as executor:
+                    analyses = list(executor.map(self._get_analysis, prompts))
+
+            if all(analysis is None for analysis, _ in analyses):
+                last_error = analyses[-1][1]
                 return RankingResults([], [], [], [], f"All models failed. Last error: {str(last_error)}")
-            
-            # Parse LLM response and create RankedResults
-            very_relevant = []
-            relevant = []
-            somewhat_relevant = []
-            not_relevant = []
-            
-            # Extract ratings using regex
-            result_pattern = r'(\d+)\. RATING: (.*?)\nEXPLANATION: (.*?)(?=\n\d+\.|$)'
-            matches = re.finditer(result_pattern, analysis, re.DOTALL)
-            
-            for match in matches:
-                index = int(match.group(1)) - 1  # Convert to 0-based index
+
+            # Score every result in one pass up front; the parse loop below
+            # just indexes into this list
+            rank_scores = [self._calculate_rank_score(result) for result in search_results]
+
+            # Parse LLM responses into (category_rank, -score, result)
+            # entries; one sort over that list orders everything, and a
+            # groupby pass partitions it back into the four categories
+            entries = []
+
+            # Extract ratings using regex; chunk-local indices map back to
+            # the global result list via the chunk offset
+            matches = [
+                (chunk_idx, match)
+                for chunk_idx, (analysis, _) in enumerate(analyses)
+                if analysis is not None
+                for match in _RESULT_RE.finditer(analysis)
+            ]
+
+            for chunk_idx, match in matches:
+                index = chunk_idx * self.BATCH_SIZE + int(match.group(1)) - 1  # Convert to 0-based index
                 if index < len(search_results):
                     result = search_results[index]
                     rating = match.group(2).strip()
                     explanation = match.group(3).strip()
                     
+                    rank_score = rank_scores[index]
                     ranked_result = RankedResult(
                         url=result.get('url', ''),
                         title=result.get('title', ''),
                         snippet=result.get('snippet', ''),
                         relevance_rating=rating,
                         relevance_explanation=explanation,
-                        rank_score=self._calculate_rank_score(result),
+                        rank_score=rank_score,
                         publication_date=result.get('publication_date')
                     )
-                    
-                    # Add to appropriate category
-                    if rating.lower() == "very relevant":
-                        very_relevant.append(ranked_result)
-                    elif rating.lower() == "relevant":
-                        relevant.append(ranked_result)
-                    elif rating.lower() == "somewhat relevant":
-                        somewhat_relevant.append(ranked_result)
-                    else:
-                        not_relevant.append(ranked_result)
-            
-            # Sort within categories by rank_score
-            very_relevant.sort(key=attrgetter('rank_score'), reverse=True)
-            relevant.sort(key=attrgetter('rank_score'), reverse=True)
-            somewhat_relevant.sort(key=attrgetter('rank_score'), reverse=True)
-            not_relevant.sort(key=attrgetter('rank_score'), reverse=True)
-            
+
+                    category = _CATEGORY_RANK.get(rating.lower(), 3)
+                    entries.append((category, -rank_score, ranked_result))
+
+            # A failed chunk must not silently drop its results: emit them
+            # unrated as score-ordered "relevant" entries, matching the
+            # small-set fast path above
+            for chunk_idx, (analysis, chunk_error) in enumerate(analyses):
+                if analysis is not None:
+                    continue
+                logger.warning(f"Ranking chunk {chunk_idx + 1} failed ({chunk_error}); keeping its results unrated")
+                offset = chunk_idx * self.BATCH_SIZE
+                for index in range(offset, min(offset + self.BATCH_SIZE, len(search_results))):
+                    result = search_results[index]
+                    rank_score = rank_scores[index]
+                    entries.append((
+                        _CATEGORY_RANK["relevant"],
+                        -rank_score,
+                        RankedResult(
+                            url=result.get('url', ''),
+                            title=result.get('title', ''),
+                            snippet=result.get('snippet', ''),
+                            relevance_rating="relevant",
+                            relevance_explanation="",
+                            rank_score=rank_score,
+                            publication_date=result.get('publication_date')
+                        )
+                    ))
+
+            # Single sort on (category, -score); the key only touches the
+            # C-level tuple slots, never the RankedResult itself
+            entries.sort(key=itemgetter(0, 1))
+            categorized = {
+                category: [entry[2] for entry in group]
+                for category, group in groupby(entries, key=itemgetter(0))
+            }
+
             return RankingResults(
-                very_relevant=very_relevant,
-                relevant=relevant,
-                somewhat_relevant=somewhat_relevant,
-                not_relevant=not_relevant
+                very_relevant=categorized.get(0, []),
+                relevant=categorized.get(1, []),
+                somewhat_relevant=categorized.get(2, []),
+                not_relevant=categorized.get(3, [])
             )
             
         except Exception as e:
@@ -1,11 +1,32 @@
 from dataclasses import dataclass
 from typing import List, Optional
-from llm_module import LLMModule
+from llm_module import LLMModule, get_shared_llm
 from analyzer_module import AnalysisResult
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from operator import attrgetter
+import re
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Evaluation parsing, compiled once: one numbered block from the batch
+# response, the importance+actions pair of a single-site response, and
+# the individual "- action" bullets
+_BLOCK_RE = re.compile(r'(\d+)\.\s*Importance:\s*(.*?)\n\s*Next Actions:\s*(.*?)(?=\n\s*\d+\.|$)', re.DOTALL)
+_EVAL_RE = re.compile(r'Importance:\s*(?P<imp>[^\n]+)\n\s*Next Actions:\s*(?P<acts>(?:\s*-\s*[^\n]+\n?)+)', re.IGNORECASE)
+_ACTION_RE = re.compile(r'-\s*([^\n]+)')
+
+# Sort order for importance ratings (very important first); anything the
+# model invents outside this scale sorts last
+_IMPORTANCE_ORDER = {
+    "very important": 0,
+    "important": 1,
+    "somewhat important": 2,
+    "not important": 3,
+    "unknown": 4
+}
+
 @dataclass
 class RankedWebsite:
     """A website that has been analyzed and ranked"""
@@ -16,6 +37,9 @@ class RankedWebsite:
     relevance: str  # e.g. "very relevant", "relevant", "somewhat relevant"
     next_actions: List[str]
     error: Optional[str] = None
+    # Numeric position of the importance rating, set at construction so
+    # sorting compares ints instead of hashing the string per comparison
+    importance_rank: int = 5
 
 class WebsiteRanker:
     """
@@ -23,88 +47,131 @@ class WebsiteRanker:
     Uses LLM to evaluate importance and adjust relevance categories.
     """
     def __init__(self):
-        self.llm = LLMModule()
+        self.llm = get_shared_llm()
+
+    def _rank_one(self, research_query: str, result: AnalysisResult) -> RankedWebsite:
+        """Evaluate a single website; fallback path when the batch call fails"""
+        importance_prompt = f"""
+        Research Query: {research_query}
+
+        Website Content Summary:
+        Title: {result.title}
+        Summary: {result.summary}
+
+        Evaluate how important this website is for answering the research query.
+        Rate it as one of: "very important", "important", "somewhat important", "not important"
+        Also suggest 2-3 specific next actions based on this content.
+
+        Format:
+        Importance: [rating]
+        Next Actions:
+        - [action 1]
+        - [action 2]
+        - [action 3]
+        """
+
+        response = self.llm.query("gemini-2.0-flash-exp", importance_prompt)
+        if response.error:
+            logger.error(f"Error ranking website {result.url}: {response.error}")
+            return RankedWebsite(
+                title=result.title,
+                url=result.url,
+                summary=result.summary,
+                importance="unknown",
+                relevance=result.relevance_rating,
+                next_actions=[],
+                error=response.error,
+                importance_rank=_IMPORTANCE_ORDER["unknown"]
+            )
+
+        importance = "somewhat important"  # default
+        next_actions = []
+        match = _EVAL_RE.search(response.content)
+        if match:
+            importance = match['imp'].strip().strip('"').lower()
+            next_actions = [action.strip() for action in _ACTION_RE.findall(match['acts'])]
+
+        return RankedWebsite(
+            title=result.title,
+            url=result.url,
+            summary=result.summary,
+            importance=importance,
+            relevance=result.relevance_rating,
+            next_actions=next_actions,
+            importance_rank=_IMPORTANCE_ORDER.get(importance, 5)
+        )
 
     def rank_websites(self, research_query: str, analyzed_results: List[AnalysisResult]) -> List[RankedWebsite]:
         """
         Ranks the analyzed websites based on their importance to the research query.
-        
+
         Args:
             research_query: The main research question/objective
             analyzed_results: List of analyzed website content
-            
+
         Returns:
             List of ranked websites with importance ratings and next actions
         """
-        ranked_websites = []
-        
-        for result in analyzed_results:
-            try:
-                # Evaluate importance and next actions using LLM
-                importance_prompt = f"""
-                Research Query: {research_query}
-                
-                Website Content Summary:
-                Title: {result.title}
-                Summary: {result.summary}
-                
-                Evaluate how important this website is for answering the research query.
-                Rate it as one of: "very important", "important", "somewhat important", "not important"
-                Also suggest 2-3 specific next actions based on this content.
-                
-                Format:
-                Importance: [rating]
-                Next Actions:
-                - [action 1]
-                - [action 2]
-                - [action 3]
-                """
-                
-                evaluation = self.llm.generate_text(importance_prompt)
-                
-                # Parse evaluation
-                importance = "somewhat important"  # default
-                next_actions = []
-                
-                for line in evaluation.split('\n'):
-                    if line.startswith('Importance:'):
-                        importance = line.split(':')[1].strip().lower()
-                    elif line.startswith('-'):
-                        next_actions.append(line[1:].strip())
-                
-                ranked_website = RankedWebsite(
+        if not analyzed_results:
+            return []
+
+        # One numbered prompt covering every site: N network round trips
+        # become 1, mirroring the batched rating prompt in SearchRanker
+        importance_prompt = f"""
+        Research Query: {research_query}
+
+        Evaluate how important each website below is for answering the research query.
+        Rate each one as exactly one of: "very important", "important", "somewhat important", "not important"
+        Also suggest 2-3 specific next actions based on its content.
+
+        For each website, format your response exactly as:
+        [NUMBER]. Importance: [rating]
+        Next Actions:
+        - [action 1]
+        - [action 2]
+
+        WEBSITES:
+        """
+
+        for i, result in enumerate(analyzed_results, 1):
+            importance_prompt += f"""
+            {i}. Title: {result.title}
+            Summary: {result.summary}
+            """
+
+        response = self.llm.query("gemini-2.0-flash-exp", importance_prompt)
+        if response.error:
+            # Batch call failed; evaluate sites individually but concurrently,
+            # so the fallback costs ~1 round trip of wall time instead of N
+            logger.error(f"Error ranking websites in batch, falling back to per-site calls: {response.error}")
+            with ThreadPoolExecutor(max_workers=min(8, len(analyzed_results))) as executor:
+                ranked_websites = list(executor.map(
+                    partial(self._rank_one, research_query),
+                    analyzed_results
+                ))
+        else:
+            # Parse the numbered evaluation blocks
+            evaluations = {}
+            for match in _BLOCK_RE.finditer(response.content):
+                index = int(match.group(1)) - 1
+                importance = match.group(2).strip().strip('"').lower()
+                next_actions = [action.strip() for action in _ACTION_RE.findall(match.group(3))]
+                evaluations[index] = (importance, next_actions)
+
+            ranked_websites = []
+            for i, result in enumerate(analyzed_results):
+                importance, next_actions = evaluations.get(i, ("somewhat important", []))
+                ranked_websites.append(RankedWebsite(
                     title=result.title,
                     url=result.url,
                     summary=result.summary,
                     importance=importance,
-                    relevance=result.relevance,
-                    next_actions=next_actions
-                )
-                
-                ranked_websites.append(ranked_website)
-                
-            except Exception as e:
-                logger.error(f"Error ranking website {result.url}: {str(e)}")
-                ranked_website = RankedWebsite(
-                    title=result.title,
-                    url=result.url,
-                    summary=result.summary,
-                    importance="unknown",
-                    relevance=result.relevance,
-                    next_actions=[],
-                    error=str(e)
-                )
-                ranked_websites.append(ranked_website)
-        
+                    relevance=result.relevance_rating,
+                    next_actions=next_actions,
+                    importance_rank=_IMPORTANCE_ORDER.get(importance, 5)
+                ))
+
         # Sort by importance (very important > important > somewhat important)
-        importance_order = {
-            "very important": 0,
-            "important": 1,
-            "somewhat important": 2,
-            "not important": 3,
-            "unknown": 4
-        }
-        
-        ranked_websites.sort(key=lambda x: importance_order.get(x.importance, 5))
-        
+        ranked_websites.sort(key=attrgetter('importance_rank'))
+
         return ranked_websites